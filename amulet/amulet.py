@@ -1,43 +1,175 @@
 # create a new pcu
-import pygame
+import time
+_T_START = time.perf_counter()
+import argparse
+from lazy import lazy_import
 from device import Device
-from ppu import PPU, SCREEN_W, SCREEN_H, init_demo_scene, move_sprite_x
+from ppu import PPU, SCREEN_H, init_demo_scene, move_sprite_x
 from rom import Rom
 from ram import Ram
 from bus import Bus
 from cpu import CPU
-from pad import ControllerHub
+from pad import ControllerHub, BTN_UP, BTN_DOWN, BTN_LEFT, BTN_RIGHT, BTN_A, BTN_B, BTN_SELECT, BTN_START
+from movie import Movie, play, state_hash
+from console import Console
+from image import image_key, load_image, save_image
+from debug import Debugger
+from apu import APU, WavSink, MixerSink
+from latency import LatencyProbe
+from coverage import Coverage
+# windowed/streaming paths import display, pipeline and stream themselves;
+# pygame (and numpy, via ppu) only load when something touches them
+pygame = lazy_import("pygame")
+_T_IMPORTS = time.perf_counter()
 
-def run_demo(cpu, bus, ppu_scale=3):
+# pygame key names, resolved when polled so importing this module stays cheap
+PAD1_KEYS = {
+    "K_UP": BTN_UP, "K_DOWN": BTN_DOWN, "K_LEFT": BTN_LEFT, "K_RIGHT": BTN_RIGHT,
+    "K_z": BTN_A, "K_x": BTN_B, "K_RSHIFT": BTN_SELECT, "K_RETURN": BTN_START,
+}
+
+def poll_pad(keys=PAD1_KEYS):
+    pressed = pygame.key.get_pressed()
+    bits = 0
+    for k, b in keys.items():
+        if pressed[getattr(pygame, k)]: bits |= b
+    return bits
+
+def run_demo(cpu, bus, ppu_scale=3, report_every=60, pads=None, movie=None, debugger=None,
+             apu=None, audio=None, probe=None, coverage=None):
+    from display import Display
     pygame.init()
-    window = pygame.display.set_mode((SCREEN_W*ppu_scale, SCREEN_H*ppu_scale))
+    display = Display(ppu_scale)
     clock = pygame.time.Clock()
 
+    if apu is not None and audio is None:
+        try:
+            audio = MixerSink(apu.sample_rate)
+        except pygame.error as e:
+            print(f"no audio: {e}")
+            apu = None
+
+    frames = 0
+    cpu_t = render_t = present_t = synth_t = 0.0
     running = True
     while running:
-        # TODO: add controller handling
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 print("Quit event")
                 running = False
+            elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_F5 and debugger is not None:
+                debugger.resume()
+            if probe is not None and ev.type in (pygame.KEYDOWN, pygame.KEYUP):
+                probe.on_event()
+        if pads is not None:
+            pads.set_state(0, poll_pad())
+            if movie is not None:
+                movie.record(pads)
+            pads.vblank_latch()
 
+        t0 = time.perf_counter()
         if cpu.running:
-            for _ in range(1000):  # i.e. 1000 ops per frame
-                # print(f"PC={cpu.pc:04X} DS={cpu.ds} RS={cpu.rs}, op={bus.read8(cpu.pc):02X}", end='\r')
-                cpu.step()
-                if not cpu.running:
+            run_cpu_frame(cpu, ppu, 1000)  # i.e. 1000 ops per frame
+            if not cpu.running:
+                if debugger is not None and debugger.paused:
+                    print(f"paused at {debugger.hits[-1]} (F5 to resume)")
+                else:
                     print("CPU halted")
                     running = False
-                    break
+
+        frame_cpu = time.perf_counter() - t0
+        cpu_t += frame_cpu
+        if coverage is not None:
+            coverage.end_frame()
 
         # vblank!
-        frame_surface = ppu.render_frame()
-        if ppu_scale != 1:
-            frame_surface = pygame.transform.scale(frame_surface, (SCREEN_W*ppu_scale, SCREEN_H*ppu_scale))
-        window.blit(frame_surface, (0,0))
-        pygame.display.flip()
+        if apu is not None:
+            apu.render_frame()
+            audio.write(apu.drain())
+            synth_t += apu.synth_time
+        ppu.render_frame()
+        if probe is not None:
+            probe.on_render()
+            display.present(ppu, overlay=probe.overlay())
+            probe.on_flip()
+        else:
+            display.present(ppu)
+        render_t += ppu.render_time
+        present_t += display.present_time
+        frames += 1
+        if report_every and frames % report_every == 0:
+            n = report_every
+            print(f"cpu {cpu_t/n*1000:6.2f}ms  render {render_t/n*1000:6.2f}ms  "
+                  f"present {present_t/n*1000:6.2f}ms  synth {synth_t/n*1000:6.2f}ms")
+            cpu_t = render_t = present_t = synth_t = 0.0
+        t0 = time.perf_counter()
         clock.tick(30) # cap to 30 fps
+        if probe is not None:
+            probe.end_frame(frame_cpu, ppu.render_time, display.scale_time, display.flip_time,
+                            time.perf_counter() - t0)
+
+    pygame.quit()
+
+def run_cpu_frame(cpu, ppu, ops_per_frame=1000):
+    """Run one frame's worth of CPU ops, then flush the console at the frame boundary."""
+    try:
+        _step_frame(cpu, ppu, ops_per_frame)
+    finally:
+        cpu.console.flush()
+
+def _step_frame(cpu, ppu, ops_per_frame):
+    # the ops are spread over the lines and the PPU told which line they fall
+    # on; that is the frame's time base (scanline splits, APU write stamps)
+    done = 0
+    for line in range(SCREEN_H):
+        ppu.set_line(line)
+        until = (line + 1) * ops_per_frame // SCREEN_H
+        while done < until:
+            # print(f"PC={cpu.pc:04X} DS={cpu.ds} RS={cpu.rs}, op={cpu.bus.read8(cpu.pc):02X}", end='\r')
+            cpu.step()
+            done += 1
+            if not cpu.running: return
+
+def frame_runner(cpu, ppu, ops_per_frame=1000, pads=None):
+    """Returns a callable that runs one frame of the machine; it returns False once halted."""
+    def emulate_frame():
+        if pads is not None:
+            pads.vblank_latch()     # start of frame: latch input set since the last one
+        if cpu.running:
+            run_cpu_frame(cpu, ppu, ops_per_frame)
+        ppu.render_frame()
+        return cpu.running
+    return emulate_frame
+
+def run_threaded(cpu, ppu, ppu_scale=3, ops_per_frame=1000, report_every=60):
+    """Like run_demo, but the machine runs on a worker thread (needs PPU(buffers=2))."""
+    from display import Display
+    from pipeline import FramePipeline
+    pygame.init()
+    display = Display(ppu_scale)
+    clock = pygame.time.Clock()
 
+    pipe = FramePipeline(ppu, display, frame_runner(cpu, ppu, ops_per_frame), fps=30)
+    pipe.start()
+    frames = 0
+    running = True
+    while running:
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT:
+                print("Quit event")
+                running = False
+        if not pipe.running:
+            print("CPU halted")
+            running = False
+
+        pipe.present()
+        frames += 1
+        if report_every and frames % report_every == 0:
+            print(pipe.stats())
+        clock.tick(30)
+
+    pipe.stop()
+    print(pipe.stats())
     pygame.quit()
 
 if __name__ == "__main__":
@@ -58,14 +190,123 @@ if __name__ == "__main__":
     # dump the rom to a binary file
     # with open("demo_rom.bin", "wb") as f:
     #     f.write(PRG_ROM)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threaded", action="store_true", help="emulate on a worker thread")
+    ap.add_argument("--scanline", action="store_true", help="scanline-timed PPU")
+    ap.add_argument("--stream", action="store_true", help="headless, serve frames on a local socket")
+    ap.add_argument("--record", metavar="FILE", help="record pad input to an input movie")
+    ap.add_argument("--play", metavar="FILE", help="replay an input movie uncapped")
+    ap.add_argument("--ff", type=int, default=0, metavar="N", help="with --play, show every Nth frame (0 = none)")
+    ap.add_argument("--console", metavar="FILE", help="write SYS print output to FILE instead of stdout")
+    ap.add_argument("--headless", type=int, metavar="FRAMES", help="run FRAMES frames with no window or rendering")
+    ap.add_argument("--image", metavar="FILE", help="cache the initialised VRAM/RAM image in FILE")
+    ap.add_argument("--timing", action="store_true", help="report import and startup time")
+    ap.add_argument("--break", dest="breaks", action="append", default=[], metavar="ADDR",
+                    help="pause when PC reaches ADDR (hex)")
+    ap.add_argument("--latency", action="store_true", help="show input-to-photon latency and frame phases")
+    ap.add_argument("--latency-log", metavar="FILE", help="with --latency, log per-frame timings as CSV")
+    ap.add_argument("--coverage", metavar="FILE",
+                    help="collect code coverage and memory heatmaps into FILE (and FILE.png)")
+    ap.add_argument("--wav", metavar="FILE", help="write audio to FILE instead of the sound card")
+    ap.add_argument("--watch", action="append", default=[], metavar="START[-END]",
+                    help="pause on reads/writes in a hex address range")
+    args = ap.parse_args()
+    if args.record and (args.breaks or args.watch):
+        # a pause can stop the CPU mid-frame, which a movie has no way to replay
+        ap.error("--record cannot be combined with --break or --watch")
+
     rom = Rom(0x0000, PRG_ROM)
     ram = Ram(0x8000, 0x2000)         # 8KB
-    ppu = PPU()
-    init_demo_scene(ppu)
+    ppu = PPU(buffers=2 if args.threaded else 1)
+    ppu.scanline_mode = args.scanline
+    key = image_key(PRG_ROM, ppu, ram)
+    if not (args.image and load_image(args.image, key, ppu, ram)):
+        init_demo_scene(ppu)
+        if args.image:
+            save_image(args.image, key, ppu, ram)
     
     pads = ControllerHub()
-    bus = Bus([rom, ram, pads, ppu])
-    cpu = CPU(bus)
+    apu = APU(clock=lambda: ppu.line / SCREEN_H)
+    bus = Bus([rom, ram, pads, ppu, apu])
+    console = Console(open(args.console, 'w') if args.console else None)
+    cpu = CPU(bus, console)
     cpu.reset(0x0000)
+    debugger = None
+    if args.breaks or args.watch:
+        debugger = Debugger(cpu)
+        for a in args.breaks:
+            debugger.add_breakpoint(int(a, 16))
+        for r in args.watch:
+            lo, _, hi = r.partition('-')
+            debugger.watch(int(lo, 16), int(hi, 16) if hi else None)
+    if args.timing:
+        t = time.perf_counter()
+        print(f"startup: imports {(_T_IMPORTS - _T_START)*1000:.1f}ms  "
+              f"machine {(t - _T_IMPORTS)*1000:.1f}ms  "
+              f"first instruction {(t - _T_START)*1000:.1f}ms after script start")
 
-    run_demo(cpu, bus, ppu_scale=2)
\ No newline at end of file
+    wav = WavSink(args.wav, apu.sample_rate) if args.wav else None
+    coverage = Coverage(cpu).attach() if args.coverage else None
+    if args.headless is not None:
+        t0 = time.perf_counter()
+        synth_t = 0.0
+        for _ in range(args.headless):
+            pads.vblank_latch()
+            run_cpu_frame(cpu, ppu)
+            if coverage is not None:
+                coverage.end_frame()
+            if wav is not None:
+                apu.render_frame()
+                wav.write(apu.drain())
+                synth_t += apu.synth_time
+            if not cpu.running: break
+        secs = time.perf_counter() - t0
+        print(f"{args.headless} frames in {secs:.2f}s")
+        if wav is not None:
+            print(f"synth {synth_t / max(args.headless, 1) * 1000:.2f}ms/frame")
+        if debugger is not None and debugger.paused:
+            print(f"paused at {debugger.hits[-1]}")
+    elif args.play:
+        movie = Movie.load(args.play)
+        on_frame = None
+        if args.ff:
+            from display import Display
+            pygame.init()
+            display = Display(2)
+            on_frame = lambda n: (pygame.event.pump(), display.present(ppu))
+        def run_frame():
+            if cpu.running:
+                run_cpu_frame(cpu, ppu)
+            if coverage is not None:
+                coverage.end_frame()
+        ok, frames, secs = play(movie, PRG_ROM, run_frame, pads, ppu, ram,
+                                render_every=args.ff, on_frame=on_frame)
+        print(f"{frames} frames in {secs:.2f}s ({frames / max(secs, 1e-9):.0f} fps), "
+              f"final state {'matches' if ok else 'DIFFERS'}")
+    elif args.stream:
+        import asyncio
+        from stream import serve_headless
+        asyncio.run(serve_headless(ppu, pads, frame_runner(cpu, ppu, pads=pads)))
+    elif args.threaded:
+        run_threaded(cpu, ppu, ppu_scale=2)
+    else:
+        movie = Movie(PRG_ROM, pads=pads.num) if args.record else None
+        probe = LatencyProbe(cpu, pads, args.latency_log).attach() if args.latency else None
+        run_demo(cpu, bus, ppu_scale=2, pads=pads, movie=movie, debugger=debugger, apu=apu, audio=wav,
+                 probe=probe, coverage=coverage)
+        if probe is not None:
+            probe.detach()
+        if movie is not None:
+            movie.final_hash = state_hash(ram, ppu)
+            movie.save(args.record)
+            print(f"recorded {movie.frames} frames to {args.record}")
+    if coverage is not None:
+        coverage.detach()
+        coverage.save(args.coverage)
+        coverage.save_heatmap(f"{args.coverage}.png")
+        print("\n".join(coverage.summary()))
+    if wav is not None:
+        wav.close()
+    console.flush()
+    if args.console:
+        console.sink.close()
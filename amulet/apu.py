@@ -0,0 +1,208 @@
+from __future__ import annotations
+import time
+import wave
+from collections import deque
+
+from device import Device
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# --- APU registers (IO) ---
+# four channels x 4 bytes from APU_BASE:
+#   +0 FREQ_LO, +1 FREQ_HI   frequency in Hz (noise: LFSR clock / 16)
+#   +2 VOL                   bits 0..3 volume, bits 4..5 square duty (12.5/25/50/75%)
+#   +3 CTRL                  bit0 enable
+APU_BASE  = 0xE010
+CH_SQ1, CH_SQ2, CH_WAVE, CH_NOISE = range(4)
+WAVE_RAM  = 0xE020          # 16B: 32 x 4-bit samples, high nibble first
+APU_END   = 0xE02F
+
+SAMPLE_RATE = 22050
+_DUTY = (0.125, 0.25, 0.5, 0.75)
+
+
+def _lfsr15():
+    # one period of the 15-bit noise LFSR (taps 0,1), as +/-1
+    out = np.empty(32767, dtype=np.float32)
+    r = 0x7FFF
+    for i in range(32767):
+        bit = (r ^ (r >> 1)) & 1
+        r = (r >> 1) | (bit << 14)
+        out[i] = 1.0 if r & 1 else -1.0
+    return out
+
+
+class APU(Device):
+    """Four-channel sound device: two squares, a wavetable and noise.
+
+    Audio is made one frame at a time. Register writes are stamped with the
+    frame position from clock() (0..1, e.g. the PPU's line / SCREEN_H) and
+    render_frame() synthesises each span between writes as whole NumPy
+    blocks, so a change lands on the right sample. Samples go to a ring
+    buffer that the host drains into pygame.mixer or a WavSink.
+
+    Writes are only queued once render_frame() has run; until then (and in
+    runs that never synthesise) they go straight into the synth state, so
+    nothing piles up.
+    """
+    def __init__(self, clock=None, sample_rate=SAMPLE_RATE, fps=30, buffer_frames=30):
+        self.clock = clock if clock is not None else (lambda: 0.0)
+        self.sample_rate = sample_rate
+        self.fps = fps
+        self.regs = bytearray(APU_END - APU_BASE + 1)
+        self._state = bytearray(self.regs)  # registers as of the synth position
+        self._events = []                   # (frame position, reg offset, value)
+        self.synthesising = False           # set by the first render_frame()
+        self._phase = [0.0] * 4
+        self._carry = 0.0                   # fractional samples owed between frames
+        self._noise = None
+        self._ring = None
+        self._ring_cap = int(sample_rate / fps * buffer_frames)
+        self._head = self._size = 0
+        self.synth_time = 0.0               # seconds spent in the last render_frame
+        self.overruns = 0                   # samples dropped because nobody drained
+
+    # ---------- Bus device plumbing ----------
+    def handles(self, addr):  return APU_BASE <= addr <= APU_END
+    def read8(self, addr):    return self.regs[addr - APU_BASE]
+
+    def write8(self, addr, val):
+        off = addr - APU_BASE
+        self.regs[off] = val & 0xFF
+        if self.synthesising:
+            self._events.append((self.clock(), off, val & 0xFF))
+        else:
+            self._state[off] = val & 0xFF
+
+    # ---------- synthesis ----------
+    def render_frame(self):
+        """Synthesise one frame of audio into the ring buffer."""
+        t0 = time.perf_counter()
+        self.synthesising = True
+        exact = self.sample_rate / self.fps + self._carry
+        n = int(exact)
+        self._carry = exact - n
+        out = np.zeros(n, dtype=np.float32)
+        pos = 0
+        for when, off, v in sorted(self._events, key=lambda e: e[0]):
+            at = min(max(int(when * n), pos), n)
+            self._synth(out[pos:at])
+            self._state[off] = v
+            pos = at
+        self._synth(out[pos:])
+        self._events.clear()
+        self._push((np.clip(out, -1.0, 1.0) * 8191).astype(np.int16))
+        self.synth_time = time.perf_counter() - t0
+
+    def _synth(self, block):
+        n = len(block)
+        if not n:
+            return
+        st, sr = self._state, self.sample_rate
+        steps = np.arange(1, n + 1, dtype=np.float64)
+        for ch in range(4):
+            base = ch * 4
+            if not st[base + 3] & 1:
+                continue
+            freq = st[base] | (st[base + 1] << 8)
+            vol = (st[base + 2] & 0xF) / 15.0 / 4       # four channels share the range
+            if not freq or not vol:
+                continue
+            step = freq / sr
+            phase = self._phase[ch] + step * steps
+            self._phase[ch] = float(phase[-1] % (1 << 20))
+            if ch in (CH_SQ1, CH_SQ2):
+                duty = _DUTY[(st[base + 2] >> 4) & 3]
+                wave_ = np.where(phase % 1.0 < duty, 1.0, -1.0)
+            elif ch == CH_WAVE:
+                raw = np.frombuffer(bytes(st[WAVE_RAM - APU_BASE:]), dtype=np.uint8)
+                table = np.empty(32, dtype=np.float32)
+                table[0::2] = raw >> 4
+                table[1::2] = raw & 0xF
+                wave_ = table[(phase * 32).astype(np.int64) % 32] / 7.5 - 1.0
+            else:
+                if self._noise is None:
+                    self._noise = _lfsr15()
+                wave_ = self._noise[(phase * 16).astype(np.int64) % len(self._noise)]
+            block += wave_ * vol
+
+    # ---------- ring buffer ----------
+    def _push(self, samples):
+        if self._ring is None:
+            self._ring = np.zeros(self._ring_cap, dtype=np.int16)
+        cap, n = self._ring_cap, len(samples)
+        if n > cap:
+            samples, n = samples[-cap:], cap
+        drop = max(0, self._size + n - cap)
+        if drop:                                   # oldest samples make way
+            self._head = (self._head + drop) % cap
+            self._size -= drop
+            self.overruns += drop
+        tail = (self._head + self._size) % cap
+        first = min(n, cap - tail)
+        self._ring[tail:tail + first] = samples[:first]
+        self._ring[:n - first] = samples[first:]
+        self._size += n
+
+    def drain(self):
+        """Return and remove everything buffered, as int16 mono samples."""
+        if not self._size:
+            return np.zeros(0, dtype=np.int16)
+        idx = (self._head + np.arange(self._size)) % self._ring_cap
+        out = self._ring[idx]
+        self._head = (self._head + self._size) % self._ring_cap
+        self._size = 0
+        return out
+
+
+class WavSink:
+    """Headless audio output: drained blocks appended to a mono 16-bit WAV."""
+    def __init__(self, path, sample_rate=SAMPLE_RATE):
+        self._w = wave.open(str(path), 'wb')
+        self._w.setnchannels(1)
+        self._w.setsampwidth(2)
+        self._w.setframerate(sample_rate)
+
+    def write(self, samples):
+        self._w.writeframes(samples.astype('<i2').tobytes())
+
+    def close(self):
+        self._w.close()
+
+
+class MixerSink:
+    """Queues drained blocks on a pygame.mixer channel.
+
+    A Channel holds one queued Sound and a second queue() replaces it, so
+    blocks wait in our own FIFO and are handed over as the slot frees. At
+    most max_pending wait; past that the oldest are dropped (counted).
+    """
+    def __init__(self, sample_rate=SAMPLE_RATE, max_pending=8):
+        import pygame
+        # allowedchanges=0: SDL converts to whatever the device wants, so the
+        # raw mono int16 blocks below always play at the right rate
+        pygame.mixer.init(frequency=sample_rate, size=-16, channels=1, allowedchanges=0)
+        self._pygame = pygame
+        self._chan = pygame.mixer.Channel(0)
+        self._pending = deque()
+        self.max_pending = max_pending
+        self.dropped = 0
+
+    def write(self, samples):
+        if len(samples):
+            self._pending.append(self._pygame.mixer.Sound(buffer=samples.astype('<i2').tobytes()))
+            while len(self._pending) > self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+        self.pump()
+
+    def pump(self):
+        """Move waiting blocks onto the channel while it has room."""
+        if self._pending and not self._chan.get_busy():
+            self._chan.play(self._pending.popleft())
+        if self._pending and self._chan.get_queue() is None:
+            self._chan.queue(self._pending.popleft())
+
+    def close(self):
+        self._pygame.mixer.quit()
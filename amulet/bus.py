@@ -1,15 +1,64 @@
-class Bus:
+PAGE_SHIFT = 8
+PAGE_SIZE  = 1 << PAGE_SHIFT
+NUM_PAGES  = 0x10000 >> PAGE_SHIFT
+
+
+class _Mixed:
+    """Page entry for a page shared by several devices (or partly unmapped)."""
     def __init__(self, devices):
         self.devices = devices
-    
     def _dev(self, addr):
         for d in self.devices:
             if d.handles(addr): return d
         raise KeyError(f"No device for address {addr:04X}")
+    def read8(self, addr):       return self._dev(addr).read8(addr)
+    def write8(self, addr, v):   self._dev(addr).write8(addr, v)
+    def read_block(self, addr, n): return self._dev(addr).read_block(addr, n)
+
+
+class _Unresolved:
+    """Page entry that works out which devices own its page on first access."""
+    def __init__(self, bus, page):
+        self.bus, self.page = bus, page
+    def read8(self, addr):       return self.bus.page_entry(self.page).read8(addr)
+    def write8(self, addr, v):   self.bus.page_entry(self.page).write8(addr, v)
+    def read_block(self, addr, n): return self.bus.page_entry(self.page).read_block(addr, n)
+
+
+class Bus:
+    def __init__(self, devices):
+        self.devices = devices
+        # one entry per 256-byte page: the owning device, or a _Mixed
+        # dispatcher; the extra page catches the +1 of 16-bit accesses at FFFF
+        self._pages = [_Unresolved(self, p) for p in range(NUM_PAGES)] + [_Mixed([])]
+
+
+    def page_entry(self, page):
+        """The entry serving page (resolved if needed); swap it with set_page_entry."""
+        entry = self._pages[page]
+        if isinstance(entry, _Unresolved):
+            base = page << PAGE_SHIFT
+            owners = [next((d for d in self.devices if d.handles(a)), None)
+                      for a in range(base, base + PAGE_SIZE)]
+            first = owners[0]
+            if first is not None and all(d is first for d in owners):
+                entry = first
+            else:
+                entry = _Mixed([d for d in self.devices if d in owners])
+            self._pages[page] = entry
+        return entry
+
+    def set_page_entry(self, page, entry): self._pages[page] = entry
     
-    def read8(self, addr):  return self._dev(addr).read8(addr)
+    def read8(self, addr):  return self._pages[addr >> PAGE_SHIFT].read8(addr)
     
-    def write8(self, addr, v): self._dev(addr).write8(addr, v & 0xFF)
+    def write8(self, addr, v): self._pages[addr >> PAGE_SHIFT].write8(addr, v & 0xFF)
+
+    # up to n bytes from addr, stopping at the end of its page, so each page's
+    # entry (and any watch or counter wrapped around it) sees its own bytes
+    def read_block(self, addr, n):
+        n = min(n, PAGE_SIZE - (addr & (PAGE_SIZE - 1)))
+        return self._pages[addr >> PAGE_SHIFT].read_block(addr, n)
     
     # def read16(self, addr): return self.read8(addr) | (self.read8((addr+1)&0xFFFF)<<8)
     
@@ -20,4 +69,4 @@ class Bus:
     def dump(self, start=0, end=0xFFFF):
         for addr in range(start, end+1, 16):
             chunk = [self.read8(a) for a in range(addr, min(addr+16, end+1))]
-            print(f"{addr:04X}: " + " ".join(f"{b:02X}" for b in chunk))
\ No newline at end of file
+            print(f"{addr:04X}: " + " ".join(f"{b:02X}" for b in chunk))
@@ -0,0 +1,31 @@
+import sys
+
+
+class Console:
+    """Buffered text output for SYS prints.
+
+    Output collects in memory and goes to the sink when the buffer fills or
+    the host calls flush() (once per frame), so a chatty ROM costs one write
+    per frame rather than one per print. sink is any text file-like object:
+    sys.stdout by default, an open file or io.StringIO for batch runs.
+    """
+    def __init__(self, sink=None, capacity=4096):
+        self.sink = sink if sink is not None else sys.stdout
+        self.capacity = capacity
+        self._buf = []
+        self._size = 0
+
+    def write(self, text: str):
+        self._buf.append(text)
+        self._size += len(text)
+        if self._size >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        if not self._buf:
+            return
+        self.sink.write(''.join(self._buf))
+        self._buf.clear()
+        self._size = 0
+        if hasattr(self.sink, 'flush'):
+            self.sink.flush()
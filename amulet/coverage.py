@@ -0,0 +1,257 @@
+"""Code coverage and memory heatmaps for a run.
+
+Counts live in flat arrays: a 64K-bit bitmap of executed PCs, u32 read and
+write counts per (device, 256-byte page), and per-frame write counts for each
+VRAM region. Collection swaps a counting step() onto the CPU and counting
+wrappers into the bus pages, so a detached run pays nothing.
+
+File layout (little-endian):
+  'ACOV' u8 version, u8 devices, u8 regions, u32 frames
+  devices x (u8 len, name), 8KB PC bitmap,
+  (devices + 1) x 256 u32 reads, the same for writes (last row = unmapped),
+  frames x regions u32 VRAM writes
+"""
+import struct
+from array import array
+
+from bus import PAGE_SHIFT, PAGE_SIZE, NUM_PAGES
+from debug import PageHook, StepHook, push_page, pull_page, push_step, pull_step
+from lazy import lazy_import
+from ppu import (PPU, TILEMAP_IDX_BASE, TILEMAP_ATT_BASE, OAM_BASE, OAM_ENTRY, MAX_SPRITES,
+                 PALETTE_BASE, TILESET_BASE, TILESET_SIZE, DISP_CTRL, SCROLL_Y, MAP_W, MAP_H,
+                 write_palette)
+
+np = lazy_import("numpy")
+
+_HDR = struct.Struct('<4sBBBI')
+_MAGIC = b'ACOV'
+_VERSION = 1
+
+# VRAM regions whose writes are counted per frame; 0 collects everything else
+REGIONS = ("tilemap", "attr", "oam", "palette", "tileset", "regs")
+_REGION_SPANS = (
+    (TILEMAP_IDX_BASE, MAP_W * MAP_H),
+    (TILEMAP_ATT_BASE, MAP_W * MAP_H),
+    (OAM_BASE, MAX_SPRITES * OAM_ENTRY),
+    (PALETTE_BASE, 32),
+    (TILESET_BASE, TILESET_SIZE),
+    (DISP_CTRL, SCROLL_Y - DISP_CTRL + 1),
+)
+
+# heatmap ramp, RGB444: black -> blue -> red -> yellow -> white
+HEAT = [(0, 0, 0), (0, 0, 4), (0, 0, 7), (1, 0, 10), (3, 0, 12), (6, 0, 12), (9, 0, 10), (12, 0, 7),
+        (14, 1, 3), (15, 4, 0), (15, 7, 0), (15, 10, 0), (15, 13, 0), (15, 15, 4), (15, 15, 9), (15, 15, 15)]
+
+
+def _region_table():
+    t = bytearray(0x10000)
+    for r, (base, size) in enumerate(_REGION_SPANS, 1):
+        t[base:base + size] = bytes([r]) * size
+    return t
+
+
+class _CountedPage(PageHook):
+    """Page entry wrapper that counts accesses by (device, page) slot and VRAM region."""
+    def __init__(self, cov):
+        super().__init__()
+        self.slot, self.region = cov._slot, cov._region
+        self.reads, self.writes, self.frame = cov.reads, cov.writes, cov._frame
+
+    def read8(self, addr):
+        self.reads[self.slot[addr]] += 1
+        return self.inner.read8(addr)
+
+    def write8(self, addr, v):
+        self.writes[self.slot[addr]] += 1
+        self.frame[self.region[addr]] += 1
+        self.inner.write8(addr, v)
+
+    def read_block(self, addr, n):
+        self.reads[self.slot[addr]] += 1        # one access, however many bytes
+        return self.inner.read_block(addr, n)
+
+
+class _CoverStep(StepHook):
+    """cpu.step wrapper that marks each instruction's address as executed."""
+    def __init__(self, cpu, bits):
+        super().__init__()
+        self.cpu, self.bits = cpu, bits
+
+    def __call__(self):
+        pc = self.cpu.pc
+        self.bits[pc >> 3] |= 1 << (pc & 7)
+        self.inner()
+
+
+class Coverage:
+    """Executed-PC bitmap, per-page access counts and VRAM write rates.
+
+    attach() starts collecting; the host calls end_frame() once per frame
+    to close that frame's VRAM counts. Its hooks chain like the Debugger's,
+    so the two attach and detach in any order. save() writes the counters and
+    load() reads them back, detached, e.g. to render or compare a past run.
+    """
+    def __init__(self, cpu=None, names=()):
+        self.cpu = cpu
+        self.names = list(names) if cpu is None else [type(d).__name__ for d in cpu.bus.devices]
+        n = len(self.names) + 1                         # + unmapped
+        self.executed = bytearray(0x10000 >> 3)
+        self.reads = array('I', bytes(4 * n * NUM_PAGES))
+        self.writes = array('I', bytes(4 * n * NUM_PAGES))
+        self.vram = array('I')                          # frames x len(REGIONS)
+        self._frame = array('I', bytes(4 * (len(REGIONS) + 1)))
+        self._region = None
+        self._slot = None
+        self._pages = {}                                # page -> _CountedPage
+        self._step = None
+
+    @property
+    def frames(self):
+        return len(self.vram) // len(REGIONS)
+
+    # ---------- collection ----------
+    def attach(self):
+        cpu, bus = self.cpu, self.cpu.bus
+        self._region = _region_table()
+        self._slot = self._slot_table(bus)
+        for page in range(NUM_PAGES):
+            cp = self._pages[page] = _CountedPage(self)
+            push_page(bus, page, cp)
+        self._step = _CoverStep(cpu, self.executed)
+        push_step(cpu, self._step)
+        return self
+
+    def _slot_table(self, bus):
+        # address -> device * NUM_PAGES + page; pages one device owns whole
+        # are filled in one go, shared ones address by address
+        unmapped = len(bus.devices)
+        slot = array('H', bytes(2 * 0x10000))
+        for page in range(NUM_PAGES):
+            base = page << PAGE_SHIFT
+            entry = bus.page_entry(page)
+            devs = [entry] if entry in bus.devices else getattr(entry, 'devices', bus.devices)
+            if not devs or devs[0] is entry:
+                d = bus.devices.index(entry) if devs else unmapped
+                slot[base:base + PAGE_SIZE] = array('H', [d * NUM_PAGES + page] * PAGE_SIZE)
+                continue
+            # a shared page lists its devices; only those need asking
+            cands = [(bus.devices.index(dev), dev) for dev in devs]
+            for a in range(base, base + PAGE_SIZE):
+                d = next((i for i, dev in cands if dev.handles(a)), unmapped)
+                slot[a] = d * NUM_PAGES + page
+        return slot
+
+    def detach(self):
+        if self._step is not None:
+            pull_step(self.cpu, self._step)
+            self._step = None
+        for page, cp in self._pages.items():
+            pull_page(self.cpu.bus, page, cp)
+        self._pages.clear()
+
+    def end_frame(self):
+        f = self._frame
+        self.vram.extend(f[1:])
+        for i in range(len(f)):
+            f[i] = 0
+
+    # ---------- views ----------
+    def executed_mask(self):
+        """(65536,) bool, True where an instruction started."""
+        return np.unpackbits(np.frombuffer(self.executed, dtype=np.uint8), bitorder='little').astype(bool)
+
+    def page_counts(self):
+        """(reads, writes), each (devices + 1, 256) uint32; the last row is unmapped space."""
+        shape = (len(self.names) + 1, NUM_PAGES)
+        return (np.frombuffer(self.reads, dtype=np.uint32).reshape(shape),
+                np.frombuffer(self.writes, dtype=np.uint32).reshape(shape))
+
+    def vram_rates(self):
+        """(frames, len(REGIONS)) uint32 writes per frame."""
+        return np.frombuffer(self.vram, dtype=np.uint32).reshape(-1, len(REGIONS))
+
+    def summary(self):
+        reads, writes = self.page_counts()
+        lines = [f"executed {int(self.executed_mask().sum())} addresses over {self.frames} frames"]
+        for i, name in enumerate(self.names):
+            touched = int(((reads[i] | writes[i]) != 0).sum())
+            lines.append(f"{name}: {int(reads[i].sum())} reads  {int(writes[i].sum())} writes  "
+                         f"{touched} pages touched")
+        if self.frames:
+            mean = self.vram_rates().mean(axis=0)
+            lines.append("vram writes/frame  " + "  ".join(f"{n} {m:.1f}" for n, m in zip(REGIONS, mean)))
+        return lines
+
+    # ---------- files ----------
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(_HDR.pack(_MAGIC, _VERSION, len(self.names), len(REGIONS), self.frames))
+            for name in self.names:
+                b = name.encode()[:255]
+                f.write(bytes([len(b)]) + b)
+            f.write(self.executed)
+            for counts in (self.reads, self.writes, self.vram):
+                f.write(np.frombuffer(counts, dtype=np.uint32).astype('<u4').tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            blob = f.read()
+        magic, version, ndev, nreg, frames = _HDR.unpack_from(blob)
+        if magic != _MAGIC or version != _VERSION or nreg != len(REGIONS):
+            raise ValueError(f"{path}: not an amulet coverage file (v{_VERSION})")
+        off, names = _HDR.size, []
+        for _ in range(ndev):
+            n = blob[off]
+            names.append(blob[off + 1:off + 1 + n].decode())
+            off += 1 + n
+        cov = cls(names=names)
+        cov.executed[:] = blob[off:off + len(cov.executed)]
+        off += len(cov.executed)
+        for counts, n in ((cov.reads, len(cov.reads)), (cov.writes, len(cov.writes)),
+                          (cov.vram, frames * nreg)):
+            data = np.frombuffer(blob, dtype='<u4', count=n, offset=off)
+            counts[:] = array('I', data.astype(np.uint32).tobytes())
+            off += 4 * n
+        return cov
+
+    # ---------- heatmap ----------
+    def heatmap(self):
+        """Colour-index image of the run, uint8 in the HEAT ramp, shaped
+        (256 + 4 + 8 * len(REGIONS), 256 + 28 * devices).
+
+        Top: one row per page. Left of that, one column per byte, lit where
+        code ran; then per device a 4-column gap and 12-column read and
+        write strips. Below a 4-row gap: an 8-row band per VRAM region,
+        frames across. Counts map to levels on a
+        fixed log scale (level = log4(count + 1)) so runs compare directly.
+        """
+        level = lambda c: np.minimum(15, np.ceil(np.log2(c.astype(np.float64) + 1) / 2)).astype(np.uint8)
+        reads, writes = self.page_counts()
+        cols = [np.where(self.executed_mask().reshape(NUM_PAGES, 256), 15, 0).astype(np.uint8)]
+        for i in range(len(self.names)):
+            cols.append(np.zeros((NUM_PAGES, 4), dtype=np.uint8))
+            cols.append(np.repeat(level(reads[i])[:, None], 12, axis=1))
+            cols.append(np.repeat(level(writes[i])[:, None], 12, axis=1))
+        top = np.concatenate(cols, axis=1)
+        width = top.shape[1]
+
+        band = np.zeros((len(REGIONS), width), dtype=np.uint8)
+        if self.frames:
+            rates = self.vram_rates()
+            # squeeze frames into the image width, keeping each bucket's peak
+            starts = np.linspace(0, self.frames, min(width, self.frames), endpoint=False).astype(np.int64)
+            peak = np.maximum.reduceat(rates, starts, axis=0)
+            band[:, :len(starts)] = level(peak).T
+        bottom = np.repeat(band, 8, axis=0)
+        gap = np.zeros((4, width), dtype=np.uint8)
+        return np.concatenate([top, gap, bottom], axis=0)
+
+    def save_heatmap(self, path):
+        """Render heatmap() through a PPU's palette and save it (any pygame image format)."""
+        import pygame
+        ppu = PPU()
+        write_palette(ppu, HEAT)
+        rgb = ppu.colourize(self.heatmap())
+        surf = pygame.surfarray.make_surface(rgb.swapaxes(0, 1))
+        pygame.image.save(surf, str(path))
@@ -1,9 +1,11 @@
 from __future__ import annotations
 from bus import Bus
+from console import Console
 
 class CPU:
-    def __init__(self, bus: Bus):
+    def __init__(self, bus: Bus, console: Console | None = None):
         self.bus = bus
+        self.console = console if console is not None else Console()
         self.pc = 0x0000
         self.running = True
         self.ds = []     # data stack (bytes)
@@ -28,14 +30,17 @@ class CPU:
             addr = (hi << 8) | lo
             out = bytearray()
             while True:
-                c = self.bus.read8(addr)
-                if c == 0: break
-                out.append(c)
-                addr = (addr + 1) & 0xFFFF
-            print(out.decode('ascii', errors='replace'), end='', flush=True)
+                chunk = self.bus.read_block(addr, 64)
+                end = chunk.find(0)
+                if end >= 0:
+                    out += chunk[:end]
+                    break
+                out += chunk
+                addr = (addr + len(chunk)) & 0xFFFF
+            self.console.write(out.decode('ascii', errors='replace'))
         elif n == 0x10:                                                   # trc
             tos = list(self.ds[-4:])
-            print(f"[PC={self.pc:04X}] DS={tos}")
+            self.console.write(f"[PC={self.pc:04X}] DS={tos}\n")
 
     def step(self):
         op = self.fetch8()
@@ -46,7 +51,7 @@ class CPU:
         if op == 0x01:                                                    # SYS
             self.exec_sys()
         elif op == 0x0F:                                                  # HLT
-            print("HLT!")
+            self.console.write("HLT!\n")
             self.running = False
 
         # stack ops
@@ -0,0 +1,204 @@
+from collections import namedtuple, deque
+
+from bus import PAGE_SHIFT
+
+Hit = namedtuple("Hit", "kind addr value pc")     # kind: 'break', 'read' or 'write'
+
+
+# ---------- hook chains ----------
+# Tools that watch the machine (Debugger, Coverage, LatencyProbe via
+# Debugger) wrap bus page entries and cpu.step. Each wrapper forwards to
+# `inner`, the entry or step it replaced, so several can stack in any order
+# and one can be pulled out of the middle without disturbing the others.
+
+class PageHook:
+    """Bus page entry that wraps the entry below it."""
+    def __init__(self, inner=None):
+        self.inner = inner
+    def read8(self, addr):         return self.inner.read8(addr)
+    def write8(self, addr, v):     self.inner.write8(addr, v)
+    def read_block(self, addr, n): return self.inner.read_block(addr, n)
+
+
+class StepHook:
+    """Replacement cpu.step that wraps the step below it."""
+    def __init__(self, inner=None):
+        self.inner = inner
+    def __call__(self):
+        self.inner()
+
+
+def push_page(bus, page, hook):
+    hook.inner = bus.page_entry(page)
+    bus.set_page_entry(page, hook)
+
+
+def pull_page(bus, page, hook):
+    entry = bus.page_entry(page)
+    if entry is hook:
+        bus.set_page_entry(page, hook.inner)
+        return
+    while isinstance(entry, PageHook):
+        if entry.inner is hook:
+            entry.inner = hook.inner
+            return
+        entry = entry.inner
+
+
+def push_step(cpu, hook):
+    hook.inner = cpu.step
+    cpu.step = hook                 # shadows CPU.step on this instance
+
+
+def pull_step(cpu, hook):
+    top = vars(cpu).get('step')
+    if top is hook:
+        if isinstance(hook.inner, StepHook):
+            cpu.step = hook.inner
+        else:
+            del cpu.step            # back to CPU.step
+        return
+    while isinstance(top, StepHook):
+        if top.inner is hook:
+            top.inner = hook.inner
+            return
+        top = top.inner
+
+
+class _WatchedPage(PageHook):
+    """Page entry wrapper that reports accesses to watched addresses."""
+    def __init__(self, dbg):
+        super().__init__()
+        self.dbg = dbg
+        self.reads = []             # (start, end) inclusive ranges on this page
+        self.writes = []
+
+    def read8(self, addr):
+        v = self.inner.read8(addr)
+        for lo, hi in self.reads:
+            if lo <= addr <= hi:
+                self.dbg._hit('read', addr, v)
+                break
+        return v
+
+    def write8(self, addr, v):
+        self.inner.write8(addr, v)
+        for lo, hi in self.writes:
+            if lo <= addr <= hi:
+                self.dbg._hit('write', addr, v)
+                break
+
+    def read_block(self, addr, n):
+        data = self.inner.read_block(addr, n)
+        end = addr + len(data) - 1
+        for lo, hi in self.reads:
+            if lo <= end and addr <= hi:
+                a = max(lo, addr)
+                self.dbg._hit('read', a, data[a - addr])
+                break
+        return data
+
+
+class _BreakStep(StepHook):
+    """cpu.step wrapper that stops at breakpoints."""
+    def __init__(self, dbg):
+        super().__init__()
+        self.dbg = dbg
+
+    def __call__(self):
+        dbg = self.dbg
+        pc = dbg.cpu.pc
+        if pc in dbg.breakpoints and pc != dbg._skip_pc:
+            dbg._hit('break', pc, None)
+            if dbg.paused:
+                return
+        dbg._skip_pc = None
+        self.inner()
+
+
+class Debugger:
+    """PC breakpoints and memory watchpoints for a CPU and its bus.
+
+    Nothing is checked while no breakpoint or watch is set: watches swap
+    wrappers into just the bus pages they cover, and breakpoints swap a
+    checking step() onto the CPU instance; both chain to what they replace.
+    Each hit is appended to hits (the most recent 256 are kept) and passed
+    to on_hit if given; otherwise the debugger pauses, clearing
+    cpu.running so the host loop stops stepping until resume().
+    """
+    def __init__(self, cpu, on_hit=None):
+        self.cpu = cpu
+        self.bus = cpu.bus
+        self.on_hit = on_hit
+        self.breakpoints = set()
+        self.hits = deque(maxlen=256)
+        self.paused = False
+        self._pages = {}            # page -> _WatchedPage
+        self._skip_pc = None        # breakpoint to step over after resume()
+        self._step = None           # _BreakStep while any breakpoint is set
+
+    # ---------- breakpoints ----------
+    def add_breakpoint(self, pc):
+        self.breakpoints.add(pc & 0xFFFF)
+        if self._step is None:
+            self._step = _BreakStep(self)
+            push_step(self.cpu, self._step)
+
+    def remove_breakpoint(self, pc):
+        self.breakpoints.discard(pc & 0xFFFF)
+        if not self.breakpoints and self._step is not None:
+            pull_step(self.cpu, self._step)
+            self._step = None
+
+    # ---------- watchpoints ----------
+    def watch(self, start, end=None, read=True, write=True):
+        """Watch start..end inclusive (a single address if end is None)."""
+        end = start if end is None else end
+        for page in range(start >> PAGE_SHIFT, (end >> PAGE_SHIFT) + 1):
+            wp = self._pages.get(page)
+            if wp is None:
+                wp = self._pages[page] = _WatchedPage(self)
+                push_page(self.bus, page, wp)
+            rng = (max(start, page << PAGE_SHIFT), min(end, ((page + 1) << PAGE_SHIFT) - 1))
+            if read: wp.reads.append(rng)
+            if write: wp.writes.append(rng)
+
+    def unwatch(self, start, end=None):
+        """Drop watches that overlap start..end; pages with none left are unwrapped."""
+        end = start if end is None else end
+        for page in range(start >> PAGE_SHIFT, (end >> PAGE_SHIFT) + 1):
+            wp = self._pages.get(page)
+            if wp is None:
+                continue
+            keep = lambda r: r[1] < start or r[0] > end
+            wp.reads = [r for r in wp.reads if keep(r)]
+            wp.writes = [r for r in wp.writes if keep(r)]
+            if not wp.reads and not wp.writes:
+                pull_page(self.bus, page, wp)
+                del self._pages[page]
+
+    def clear(self):
+        for page, wp in self._pages.items():
+            pull_page(self.bus, page, wp)
+        self._pages.clear()
+        for pc in list(self.breakpoints):
+            self.remove_breakpoint(pc)
+
+    # ---------- hits / pause ----------
+    def _hit(self, kind, addr, value):
+        hit = Hit(kind, addr, value, self.cpu.pc)
+        self.hits.append(hit)
+        if self.on_hit is not None:
+            self.on_hit(hit)
+        else:
+            self.paused = True
+            self.cpu.running = False
+
+    def resume(self):
+        if self.paused:
+            # a breakpoint stops before its instruction, so step over it once;
+            # a watch stops after the access, and pc may well be a breakpoint
+            if self.hits[-1].kind == 'break':
+                self._skip_pc = self.cpu.pc
+            self.paused = False
+            self.cpu.running = True
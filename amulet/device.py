@@ -1,4 +1,11 @@
 class Device:
     def read8(self, addr: int) -> int: raise NotImplementedError
     def write8(self, addr: int, val: int): raise NotImplementedError
-    def handles(self, addr: int) -> bool: raise NotImplementedError
\ No newline at end of file
+    def handles(self, addr: int) -> bool: raise NotImplementedError
+    def read_block(self, addr: int, n: int) -> bytes:
+        # devices backed by a buffer override this with a slice
+        out = bytearray()
+        for a in range(addr, min(addr + n, 0x10000)):
+            if not self.handles(a): break
+            out.append(self.read8(a))
+        return bytes(out)
@@ -0,0 +1,63 @@
+import time
+import pygame
+
+from ppu import SCREEN_W, SCREEN_H
+
+
+class Display:
+    """Host window: scales the PPU frame up to the window and presents it.
+
+    The frame is scaled with transform.scale into a destination kept for
+    the life of the window: the window itself when its pixel format matches
+    the frame's, otherwise a scratch surface that is then blitted across.
+    """
+    def __init__(self, scale=3, caption="amulet"):
+        self.scale = scale
+        self.size = (int(SCREEN_W * scale), int(SCREEN_H * scale))
+        self.window = pygame.display.set_mode(self.size)
+        pygame.display.set_caption(caption)
+        self._scaled = None         # scale destination, made on first present
+        self._font = None           # for overlay text, made on first use
+
+        # timing of the most recent present (seconds)
+        self.scale_time = 0.0
+        self.flip_time = 0.0
+
+    @property
+    def present_time(self):
+        return self.scale_time + self.flip_time
+
+    def present(self, ppu, overlay=None):
+        """Scale ppu's front buffer into the window, draw overlay lines and flip."""
+        self.present_frame(ppu.front_surface, overlay)
+
+    def present_frame(self, surface, overlay=None):
+        t0 = time.perf_counter()
+        if self.scale == 1:
+            self.window.blit(surface, (0, 0))
+        else:
+            if self._scaled is None:
+                # transform.scale wants a dest in the source's format
+                same = (surface.get_bitsize() == self.window.get_bitsize()
+                        and surface.get_masks() == self.window.get_masks())
+                self._scaled = self.window if same else pygame.Surface(self.size, 0, surface)
+            pygame.transform.scale(surface, self.size, self._scaled)
+            if self._scaled is not self.window:
+                self.window.blit(self._scaled, (0, 0))
+        if overlay:
+            self._draw_overlay(overlay)
+        t1 = time.perf_counter()
+        pygame.display.flip()
+        t2 = time.perf_counter()
+        self.scale_time = t1 - t0
+        self.flip_time = t2 - t1
+
+    def _draw_overlay(self, lines):
+        if self._font is None:
+            pygame.font.init()
+            self._font = pygame.font.Font(None, 18)
+        y = 2
+        for line in lines:
+            text = self._font.render(line, True, (255, 255, 255), (0, 0, 0))
+            self.window.blit(text, (2, y))
+            y += text.get_height()
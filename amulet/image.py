@@ -0,0 +1,59 @@
+"""Machine image cache: the initialised PPU and RAM state saved to disk.
+
+Building the demo scene takes tens of thousands of write8 calls; a later
+launch can instead map the saved image and copy it in with a few slice
+assignments. The image is keyed on the ROM and the machine layout, so a
+different ROM or PPU/RAM configuration just rebuilds it.
+
+File layout (little-endian):
+  'AIMG' u8 version, 32B key, u32 ppu bytes, u32 ram bytes, then the
+  PPU snapshot followed by RAM
+"""
+import hashlib
+import mmap
+import os
+import struct
+
+_HDR = struct.Struct('<4sB32sII')
+_MAGIC = b'AIMG'
+_VERSION = 2                    # 2: demo scene parks unused sprite slots
+
+
+def image_key(rom: bytes, ppu, ram) -> bytes:
+    h = hashlib.sha256(bytes(rom))
+    h.update(f"sprites={ppu.num_sprites};ram={ram.start:04X}+{ram.size:04X}".encode())
+    return h.digest()
+
+
+def save_image(path, key: bytes, ppu, ram):
+    ppu_blob, ram_blob = ppu.snapshot(), ram.dump()
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_HDR.pack(_MAGIC, _VERSION, key, len(ppu_blob), len(ram_blob)))
+        f.write(ppu_blob)
+        f.write(ram_blob)
+    os.replace(tmp, path)       # never leave a half-written image behind
+
+
+def load_image(path, key: bytes, ppu, ram) -> bool:
+    """Restore ppu and ram from path. Returns False if missing or stale."""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return False
+    if os.fstat(f.fileno()).st_size < _HDR.size:
+        f.close()
+        return False            # empty or cut short (mmap refuses empty files)
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, k, plen, rlen = _HDR.unpack_from(mm)
+        if magic != _MAGIC or version != _VERSION or k != key:
+            return False
+        if len(mm) != _HDR.size + plen + rlen or rlen != ram.size:
+            return False
+        view = memoryview(mm)
+        try:
+            ppu.restore(view[_HDR.size:_HDR.size + plen])
+            ram.load(view[_HDR.size + plen:])
+        finally:
+            view.release()      # the mmap can't close while a view is alive
+    return True
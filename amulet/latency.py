@@ -0,0 +1,125 @@
+import time
+from collections import deque
+
+from debug import Debugger
+from pad import ControllerHub
+from ppu import TILEMAP_IDX_BASE, TILESET_BASE, TILESET_SIZE, SCROLL_X, SCROLL_Y
+
+# stage timestamps of one input, in order
+STAGES = ("event", "set_state", "pad_read", "vram_write", "render", "flip")
+
+
+class LatencyProbe:
+    """Times host input through the machine to the frame that shows it.
+
+    An input chain starts at a host event and is stamped at set_state (only
+    if the bits changed), the CPU's next PAD1/PAD2 read, the first VRAM or
+    scroll write after that, the next render_frame and the next flip. One
+    chain is in flight at a time. The pad read and VRAM write stamps use
+    Debugger watches with a callback, so nothing is checked once detached.
+
+    Each frame also records its phase times (cpu, render, scale, flip,
+    sleep); end_frame() appends them, plus any finished chain, to the log.
+    """
+    def __init__(self, cpu, pads, log_path=None, keep=512, timeout=1.0):
+        self.cpu = cpu
+        self.pads = pads
+        self.latencies = deque(maxlen=keep)     # event -> flip, seconds
+        self.last_phases = None
+        self._chain = None                      # stage -> timestamp
+        self.timeout = timeout                  # give up on a chain the ROM never shows
+        self.abandoned = 0
+        self._done = None                       # chain finished this frame
+        self._frame = 0
+        self._dbg = None
+        self._log = open(log_path, 'w') if log_path else None
+        if self._log is not None:
+            self._log.write("frame,cpu_ms,render_ms,scale_ms,flip_ms,sleep_ms,latency_ms,"
+                            + ",".join(f"{a}_{b}_ms" for a, b in zip(STAGES, STAGES[1:])) + "\n")
+
+    def attach(self):
+        self._dbg = Debugger(self.cpu, on_hit=self._on_hit)
+        self._dbg.watch(ControllerHub.PAD1, ControllerHub.PAD2, write=False)
+        self._dbg.watch(TILEMAP_IDX_BASE, TILESET_BASE + TILESET_SIZE - 1, read=False)
+        self._dbg.watch(SCROLL_X, SCROLL_Y, read=False)
+        hub_set = type(self.pads).set_state
+        def set_state(pad_index, bits):
+            before = list(self.pads.live)
+            hub_set(self.pads, pad_index, bits)
+            if self.pads.live != before:
+                self._stamp("set_state", after="event")
+        self.pads.set_state = set_state         # shadows the method on this hub
+        return self
+
+    def detach(self):
+        if self._dbg is not None:
+            self._dbg.clear()
+            self._dbg = None
+        vars(self.pads).pop('set_state', None)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # ---------- stamps ----------
+    def on_event(self):
+        now = time.perf_counter()
+        if self._chain is not None and now - self._chain["event"] > self.timeout:
+            self._chain = None
+            self.abandoned += 1
+        if self._chain is None:
+            self._chain = {"event": now}
+
+    def on_render(self):
+        self._stamp("render", after="vram_write")
+
+    def on_flip(self):
+        if self._stamp("flip", after="render"):
+            self._done = self._chain
+            self.latencies.append(self._chain["flip"] - self._chain["event"])
+            self._chain = None
+
+    def _on_hit(self, hit):
+        if hit.kind == 'read':
+            self._stamp("pad_read", after="set_state")
+        else:
+            self._stamp("vram_write", after="pad_read")
+
+    def _stamp(self, stage, after):
+        c = self._chain
+        if c is None or after not in c or stage in c:
+            return False
+        c[stage] = time.perf_counter()
+        return True
+
+    # ---------- reporting ----------
+    def end_frame(self, cpu, render, scale, flip, sleep):
+        """Record this frame's phase times (seconds)."""
+        self._frame += 1
+        self.last_phases = (cpu, render, scale, flip, sleep)
+        done, self._done = self._done, None
+        if self._log is None:
+            return
+        ms = [f"{t * 1000:.3f}" for t in self.last_phases]
+        if done is not None:
+            ms.append(f"{(done['flip'] - done['event']) * 1000:.3f}")
+            ms += [f"{(done[b] - done[a]) * 1000:.3f}" for a, b in zip(STAGES, STAGES[1:])]
+        else:
+            ms += [""] * len(STAGES)
+        self._log.write(f"{self._frame}," + ",".join(ms) + "\n")
+
+    def percentiles(self, ps=(50, 95, 99)):
+        lat = sorted(self.latencies)
+        if not lat:
+            return {}
+        return {p: lat[min(len(lat) - 1, len(lat) * p // 100)] for p in ps}
+
+    def overlay(self):
+        lines = []
+        pc = self.percentiles()
+        if pc:
+            lines.append("input->photon " + "  ".join(f"p{p} {v * 1000:.1f}ms" for p, v in pc.items())
+                         + f"  (n={len(self.latencies)})")
+        if self.last_phases is not None:
+            names = ("cpu", "render", "scale", "flip", "sleep")
+            lines.append("  ".join(f"{n} {t * 1000:.1f}" for n, t in zip(names, self.last_phases)))
+        return lines
@@ -0,0 +1,20 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Return module `name`, deferring its actual import until first attribute use.
+
+    Keeps heavy dependencies (numpy, pygame) off the startup path of runs
+    that never touch them, e.g. headless replay without rendering.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
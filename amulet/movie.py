@@ -0,0 +1,92 @@
+"""Input movies: per-frame pad bits for a ROM, replayable deterministically.
+
+File layout (little-endian):
+  'AMOV' u8 version, u8 pads, u32 frames, 32B sha256(rom), 32B final state hash
+  then frames x pads bytes of pad bits, in frame order
+"""
+import hashlib
+import struct
+import time
+
+_HDR = struct.Struct('<4sBBI32s32s')
+_MAGIC = b'AMOV'
+_VERSION = 1
+
+
+def rom_hash(data: bytes) -> bytes:
+    return hashlib.sha256(bytes(data)).digest()
+
+
+def state_hash(ram, ppu) -> bytes:
+    """Hash of RAM plus PPU memory and registers.
+
+    STATUS is left out: its sprite overflow bit is a by-product of rendering,
+    and playback may skip rendering.
+    """
+    h = hashlib.sha256(ram.dump())
+    for block in (ppu.tilemap_idx, ppu.tilemap_att, ppu.oam, ppu.palette_raw, ppu.tileset):
+        h.update(block)
+    h.update(bytes([ppu.disp_ctrl, ppu.scroll_x, ppu.scroll_y]))
+    return h.digest()
+
+
+class Movie:
+    def __init__(self, rom: bytes, pads=2):
+        self.rom_hash = rom_hash(rom)
+        self.pads = pads
+        self.inputs = bytearray()       # pads bytes per frame
+        self.final_hash = bytes(32)
+
+    @property
+    def frames(self):
+        return len(self.inputs) // self.pads
+
+    def record(self, hub):
+        """Append the pad bits the hub is about to latch for this frame."""
+        self.inputs += bytes(hub.live[:self.pads])
+
+    def frame_bits(self, n):
+        return self.inputs[n * self.pads:(n + 1) * self.pads]
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(_HDR.pack(_MAGIC, _VERSION, self.pads, self.frames, self.rom_hash, self.final_hash))
+            f.write(self.inputs)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            blob = f.read()
+        magic, version, pads, frames, rh, fh = _HDR.unpack_from(blob)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path}: not an amulet movie (v{_VERSION})")
+        m = cls(b'', pads)
+        m.rom_hash, m.final_hash = rh, fh
+        m.inputs = bytearray(blob[_HDR.size:_HDR.size + frames * pads])
+        if len(m.inputs) != frames * pads:
+            raise ValueError(f"{path}: truncated, expected {frames} frames")
+        return m
+
+
+def play(movie, rom: bytes, run_frame, hub, ppu, ram, render_every=0, on_frame=None):
+    """Replay movie as fast as possible and check the final state.
+
+    run_frame runs one frame of CPU ops. The PPU renders every
+    render_every-th frame (0 = never); on_frame(n) is called after each of
+    those renders, e.g. to present it. Returns (ok, frames, seconds).
+    """
+    if rom_hash(rom) != movie.rom_hash:
+        raise ValueError("movie was recorded against a different ROM")
+    t0 = time.perf_counter()
+    for n in range(movie.frames):
+        # start of frame: feed and latch this frame's recorded input
+        for i, bits in enumerate(movie.frame_bits(n)):
+            hub.set_state(i, bits)
+        hub.vblank_latch()
+        run_frame()
+        if render_every and n % render_every == 0:
+            ppu.render_frame()
+            if on_frame is not None:
+                on_frame(n)
+    elapsed = time.perf_counter() - t0
+    return state_hash(ram, ppu) == movie.final_hash, movie.frames, elapsed
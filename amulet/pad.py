@@ -1,5 +1,15 @@
 from device import Device
 
+# pad bits
+BTN_UP     = 1 << 0
+BTN_DOWN   = 1 << 1
+BTN_LEFT   = 1 << 2
+BTN_RIGHT  = 1 << 3
+BTN_A      = 1 << 4
+BTN_B      = 1 << 5
+BTN_SELECT = 1 << 6
+BTN_START  = 1 << 7
+
 class ControllerHub(Device):
     PAD1 = 0xE00A
     PAD2 = 0xE00B
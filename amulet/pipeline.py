@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class FramePipeline:
+    """Runs emulation on a worker thread and presents on the calling thread.
+
+    The PPU must be double-buffered (PPU(buffers=2)). The worker renders into
+    the back buffer and swaps at vblank; the presenter shows the front buffer.
+    pygame wants the window and event pump on the main thread, so the
+    presenter stays there and the machine gets the worker.
+
+    A frame is *dropped* if it was rendered but replaced before it was ever
+    presented, and *duplicated* if a present found no new frame.
+    """
+    def __init__(self, ppu, display, emulate_frame, fps=30):
+        self.ppu = ppu
+        self.display = display
+        self.emulate_frame = emulate_frame  # runs one frame; returns False once halted
+        self.fps = fps
+
+        self._lock = threading.Lock()
+        self._presenting = False    # presenter is reading the front buffer
+        self._fresh = False         # front buffer has not been presented yet
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.emulated = 0
+        self.presented = 0
+        self.dropped = 0
+        self.duplicated = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        # build the PPU's render state and surfaces here, before the worker
+        # exists; left lazy, both threads could build them on the first frame
+        self.ppu.surface
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._emulate, name="amulet-emu", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # ---------- worker ----------
+    def _emulate(self):
+        period = 1.0 / self.fps
+        deadline = time.perf_counter()
+        while not self._stop.is_set():
+            alive = self.emulate_frame()
+            self._vblank()
+            if not alive:
+                break
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.perf_counter()  # fell behind; don't try to catch up
+
+    def _vblank(self):
+        with self._lock:
+            self.emulated += 1
+            if self._presenting:
+                # front buffer is busy: this frame is overwritten by the next one
+                self.dropped += 1
+                return
+            if self._fresh:
+                self.dropped += 1       # previous frame never made it to screen
+            self.ppu.swap_buffers()
+            self._fresh = True
+
+    # ---------- presenter ----------
+    def present(self):
+        """Show the front buffer once. Call from the thread that owns the window."""
+        with self._lock:
+            if self._fresh:
+                self.presented += 1
+            else:
+                self.duplicated += 1
+            self._fresh = False
+            self._presenting = True
+        try:
+            self.display.present(self.ppu)
+        finally:
+            with self._lock:
+                self._presenting = False
+
+    def stats(self):
+        return (f"emulated {self.emulated}  presented {self.presented}  "
+                f"dropped {self.dropped}  duplicated {self.duplicated}")
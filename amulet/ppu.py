@@ -1,7 +1,13 @@
-import numpy as np
-import pygame
+from __future__ import annotations
+import time
 
 from device import Device
+from lazy import lazy_import
+
+# numpy/pygame load on first render, so a PPU that is only written to
+# (headless runs, replays that skip rendering) never imports them
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
 
 # --- geometry / map constants ---
 SCREEN_W, SCREEN_H = 224, 256
@@ -12,8 +18,10 @@ MAX_TILES = 256
 # --- memory map (CPU-visible addresses) ---
 TILEMAP_IDX_BASE = 0xA000           # 896 bytes
 TILEMAP_ATT_BASE = 0xA380           # 896 bytes
-OAM_BASE         = 0xA800           # 16 sprites x 16B = 256B
-PALETTE_BASE     = 0xA900           # 32B (16 x RGB444)
+OAM_BASE         = 0xA800           # up to 256 sprites x 4B (x, y, tile, attr)
+OAM_ENTRY        = 4                # a sprite with x >= SCREEN_W is hidden: not drawn, not counted
+MAX_SPRITES      = 256
+PALETTE_BASE     = 0xAC00           # 32B (16 x RGB444)
 TILESET_BASE     = 0xB000           # 8192B (256 tiles x 32B)
 TILESET_SIZE     = 8192
 
@@ -24,11 +32,21 @@ SCROLL_X  = 0xE002
 SCROLL_Y  = 0xE003
 # E004..E009 reserved for DMA in future
 
+# STATUS bits
+STATUS_SPR_OVERFLOW = 1 << 5        # a line had more sprites than sprite_limit
+
+# sprite band index granularity
+BAND_LINES = 8
+N_BANDS    = SCREEN_H // BAND_LINES
+
 
 class PPU(Device):
     """PPU as a bus device: owns VRAM regions + IO regs and renders to a pygame Surface."""
-    def __init__(self, scale=3):
+    def __init__(self, scale=3, buffers=1, sprites=64, sprite_limit=None):
+        assert 0 < sprites <= MAX_SPRITES
         self.scale = scale
+        self.num_sprites = sprites
+        self.sprite_limit = sprite_limit    # max sprites drawn per line (None = no limit)
         # IO regs
         self.disp_ctrl = 0
         self.status = 0
@@ -38,24 +56,143 @@ class PPU(Device):
         # VRAM blocks (CPU view mapped below)
         self.tilemap_idx = bytearray(MAP_W * MAP_H)      # 0xA000
         self.tilemap_att = bytearray(MAP_W * MAP_H)      # 0xA380
-        self.oam         = bytearray(16 * 16)            # 0xA800
-        self._pal_raw    = bytearray(32)                 # 0xA900 (RGB444 packed LE)
+        self.oam         = bytearray(sprites * OAM_ENTRY) # 0xA800
+        self._pal_raw    = bytearray(32)                 # 0xAC00 (RGB444 packed LE)
         self.tileset     = bytearray(TILESET_SIZE)       # 0xB000
 
-        # Derived palette: 16 x (r,g,b) in 8-bit
+        # Render state (numpy arrays, pygame surfaces) is built on first use
+        self._buffers = buffers
+        self._render_ready = False
+        self._fbs = self._surfaces = None
+        self._back = 0
+        self._fb = None
+        self.render_time = 0.0      # seconds spent in the last render_frame
+
+        # Derived palette: 16 x (r,g,b) in 8-bit (numpy LUT once rendering)
         self.palette = [(0, 0, 0)] * 16
         self._recalc_palette()
 
-        # Framebuffer (numpy) and pygame surface
-        self._fb = np.zeros((SCREEN_H, SCREEN_W, 3), dtype=np.uint8)
-        self.surface = pygame.Surface((SCREEN_W, SCREEN_H))
+        self._tiles_dirty = True
+        self._dirty_tids = set()    # tiles whose pattern changed since the last BG refresh
+
+        # Scanline mode: split the frame into bands at mid-frame writes
+        self.scanline_mode = False
+        self.line = 0               # current beam line, set by the host
+        self._band_start = 0        # first line not yet rendered this frame
+        self.bands = 0              # mid-frame splits so far this frame
+        self.frame_bands = 1        # bands used by the last rendered frame
+
+    def _init_render(self):
+        self._pal_lut = np.array(self.palette, dtype=np.uint8)
+
+        # Colour-index plane: what render_frame composes before palette lookup
+        self._ci = np.zeros((SCREEN_H, SCREEN_W), dtype=np.uint8)
+        self._tiles = np.zeros((MAX_TILES, TILE_H, TILE_W), dtype=np.uint8)
+        self._tiles_dirty = True
+
+        # Background layer cache: the whole tilemap composed (unscrolled) into
+        # colour indices and a priority plane. Cells are redrawn only when
+        # their tilemap/attr byte or their tile's pattern changes; scrolling
+        # just picks a wrapped window out of it.
+        self._bg_ci = np.zeros((SCREEN_H, SCREEN_W), dtype=np.uint8)
+        self._bg_prio = np.zeros((SCREEN_H, SCREEN_W), dtype=np.bool_)
+        self._bg_dirty = np.ones((MAP_H, MAP_W), dtype=np.bool_)
+
+        # Sprite band index: _spr_bands[b, i] is set if sprite i covers any
+        # line of band b (BAND_LINES lines each). Kept current on OAM writes
+        # to y/attr so rendering only looks at sprites near the lines it draws.
+        self._oam_np = np.frombuffer(self.oam, dtype=np.uint8).reshape(self.num_sprites, OAM_ENTRY)
+        self._spr_bands = np.zeros((N_BANDS, self.num_sprites), dtype=np.bool_)
+
+        # Framebuffers (numpy). _fb is the back buffer; with buffers=2 the
+        # other one is the front buffer a presenter may be reading, and
+        # swap_buffers() flips them.
+        self._fbs = [np.zeros((SCREEN_H, SCREEN_W, 3), dtype=np.uint8) for _ in range(self._buffers)]
+        self._fb = self._fbs[self._back]
+        self._render_ready = True
+        for i in range(self.num_sprites):
+            self._index_sprite(i)
+
+    def _ensure_render(self):
+        if not self._render_ready:
+            self._init_render()
+
+    def _ensure_surfaces(self):
+        # pygame surfaces sharing each framebuffer's memory, so rendering into
+        # _fb is visible to pygame without an upload copy
+        self._ensure_render()
+        if self._surfaces is None:
+            self._surfaces = [pygame.image.frombuffer(fb, (SCREEN_W, SCREEN_H), 'RGB') for fb in self._fbs]
+
+    @property
+    def surface(self):
+        """pygame Surface backed by the back buffer."""
+        self._ensure_surfaces()
+        return self._surfaces[self._back]
+
+    @property
+    def framebuffer(self) -> np.ndarray:
+        """(SCREEN_H, SCREEN_W, 3) RGB view of the back buffer's surface pixels."""
+        self._ensure_render()
+        return self._fb
+
+    @property
+    def index_plane(self) -> np.ndarray:
+        """(SCREEN_H, SCREEN_W) colour indices of the last rendered frame."""
+        self._ensure_render()
+        return self._ci
+
+    @property
+    def palette_raw(self) -> bytes:
+        """The 32 bytes of palette RAM (16 x RGB444, little-endian)."""
+        return bytes(self._pal_raw)
+
+    @property
+    def front_framebuffer(self) -> np.ndarray:
+        self._ensure_render()
+        return self._fbs[(self._back + 1) % self._buffers]
+
+    @property
+    def front_surface(self):
+        self._ensure_surfaces()
+        return self._surfaces[(self._back + 1) % self._buffers]
+
+    def swap_buffers(self):
+        """Make the last rendered frame the front buffer (no-op when single-buffered)."""
+        self._back = (self._back + 1) % self._buffers
+        if self._render_ready:
+            self._fb = self._fbs[self._back]
+
+    # ---------- Snapshot (machine image cache) ----------
+    def snapshot(self) -> bytes:
+        """Registers and all VRAM blocks as one blob, for restore()."""
+        regs = bytes([self.disp_ctrl, self.status, self.scroll_x, self.scroll_y])
+        return regs + bytes(self.tilemap_idx) + bytes(self.tilemap_att) + bytes(self.oam) \
+            + bytes(self._pal_raw) + bytes(self.tileset)
+
+    def restore(self, blob):
+        """Load a snapshot() blob (any buffer, e.g. an mmap slice) in bulk."""
+        blocks = (self.tilemap_idx, self.tilemap_att, self.oam, self._pal_raw, self.tileset)
+        if len(blob) != 4 + sum(len(b) for b in blocks):
+            raise ValueError("PPU snapshot does not match this PPU's layout")
+        self.disp_ctrl, self.status, self.scroll_x, self.scroll_y = bytes(blob[:4])
+        off = 4
+        for b in blocks:
+            b[:] = blob[off:off + len(b)]
+            off += len(b)
+        self._recalc_palette()
+        self._tiles_dirty = True
+        if self._render_ready:
+            self._bg_dirty[:] = True
+            for i in range(self.num_sprites):
+                self._index_sprite(i)
 
     # ---------- Bus device plumbing ----------
     def handles(self, addr: int) -> bool:
         return (
             (TILEMAP_IDX_BASE <= addr < TILEMAP_IDX_BASE + MAP_W*MAP_H) or
             (TILEMAP_ATT_BASE <= addr < TILEMAP_ATT_BASE + MAP_W*MAP_H) or
-            (OAM_BASE         <= addr < OAM_BASE         + 16*16)       or
+            (OAM_BASE         <= addr < OAM_BASE         + len(self.oam)) or
             (PALETTE_BASE     <= addr < PALETTE_BASE     + 32)          or
             (TILESET_BASE     <= addr < TILESET_BASE     + TILESET_SIZE) or
             (DISP_CTRL        <= addr <= SCROLL_Y)
@@ -71,7 +208,7 @@ class PPU(Device):
             return self.tilemap_idx[addr - TILEMAP_IDX_BASE]
         if TILEMAP_ATT_BASE <= addr < TILEMAP_ATT_BASE + MAP_W*MAP_H:
             return self.tilemap_att[addr - TILEMAP_ATT_BASE]
-        if OAM_BASE <= addr < OAM_BASE + 16*16:
+        if OAM_BASE <= addr < OAM_BASE + len(self.oam):
             return self.oam[addr - OAM_BASE]
         if PALETTE_BASE <= addr < PALETTE_BASE + 32:
             return self._pal_raw[addr - PALETTE_BASE]
@@ -83,21 +220,36 @@ class PPU(Device):
         v = val & 0xFF
         if addr == DISP_CTRL: self.disp_ctrl = v; return
         if addr == STATUS:    self.status = v;    return  # usually read-only; fine for now
+        if self.scanline_mode and self.line > self._band_start and self.read8(addr) != v:
+            self._catch_up()
         if addr == SCROLL_X:  self.scroll_x = v;  return
         if addr == SCROLL_Y:  self.scroll_y = v;  return
 
         if TILEMAP_IDX_BASE <= addr < TILEMAP_IDX_BASE + MAP_W*MAP_H:
-            self.tilemap_idx[addr - TILEMAP_IDX_BASE] = v; return
+            off = addr - TILEMAP_IDX_BASE
+            self.tilemap_idx[off] = v
+            if self._render_ready: self._bg_dirty.flat[off] = True
+            return
         if TILEMAP_ATT_BASE <= addr < TILEMAP_ATT_BASE + MAP_W*MAP_H:
-            self.tilemap_att[addr - TILEMAP_ATT_BASE] = v; return
-        if OAM_BASE <= addr < OAM_BASE + 16*16:
-            self.oam[addr - OAM_BASE] = v; return
+            off = addr - TILEMAP_ATT_BASE
+            self.tilemap_att[off] = v
+            if self._render_ready: self._bg_dirty.flat[off] = True
+            return
+        if OAM_BASE <= addr < OAM_BASE + len(self.oam):
+            off = addr - OAM_BASE
+            self.oam[off] = v
+            if self._render_ready and off % OAM_ENTRY != 2:     # x (hidden), y or attr (size) moved it
+                self._index_sprite(off // OAM_ENTRY)
+            return
         if PALETTE_BASE <= addr < PALETTE_BASE + 32:
             self._pal_raw[addr - PALETTE_BASE] = v
             self._recalc_palette()
             return
         if TILESET_BASE <= addr < TILESET_BASE + TILESET_SIZE:
-            self.tileset[addr - TILESET_BASE] = v; return
+            self.tileset[addr - TILESET_BASE] = v
+            self._tiles_dirty = True
+            self._dirty_tids.add((addr - TILESET_BASE) // 32)
+            return
 
     # ---------- Palette helpers ----------
     def _recalc_palette(self):
@@ -112,90 +264,151 @@ class PPU(Device):
             b = (word >> 0) & 0xF
             pals.append((r * 17, g * 17, b * 17))
         self.palette = pals
+        if self._render_ready:
+            self._pal_lut[:] = pals
 
     # ---------- Rendering ----------
+    # The frame is drawn in horizontal bands [y0, y1). Normally that is a
+    # single band covering the whole screen. In scanline mode the host calls
+    # set_line() as it runs the CPU, and any write that changes what is on
+    # screen first renders the lines above it with the old state, so scroll
+    # splits and raster palette changes land on the right line.
+
+    def set_line(self, line: int):
+        """Scanline mode: tell the PPU which line the beam is on."""
+        self.line = line
+
+    def _catch_up(self):
+        # called before a visible write lands mid-frame
+        self._ensure_render()
+        if self.line > self._band_start:
+            self._render_band(self._band_start, min(self.line, SCREEN_H))
+            self._band_start = self.line
+            self.bands += 1
+
     def render_frame(self):
-        """Compose BG then sprites into self._fb and upload to pygame surface."""
-        # Pass 1: background
-        bg_prio = np.zeros((SCREEN_H, SCREEN_W), dtype=np.bool_)
-        # Iterate per pixel (simple, readable; optimise later)
-        for y in range(SCREEN_H):
-            sy = (y + self.scroll_y) % SCREEN_H
-            ty = sy // TILE_H
-            py = sy % TILE_H
-            row_base_idx = ty * MAP_W
-            for x in range(SCREEN_W):
-                sx = (x + self.scroll_x) % SCREEN_W
-                tx = sx // TILE_W
-                px = sx % TILE_W
-                idx = self.tilemap_idx[row_base_idx + tx]
-                attr = self.tilemap_att[row_base_idx + tx]
-                hflip = (attr >> 4) & 1
-                vflip = (attr >> 5) & 1
-                prio  = (attr >> 6) & 1
-
-                # fetch tile row
-                row = self._fetch_tile_row(idx, py, bool(hflip), bool(vflip))
-                ci = row[px]
-                self._fb[y, x] = self.palette[ci]
-                bg_prio[y, x] = bool(prio)
+        """Compose BG then sprites into self._ci, then colour into self._fb (which backs self.surface).
+
+        Returns the back buffer's surface, or None if nothing has asked for a
+        surface yet (headless runs never import pygame).
+        """
+        t0 = time.perf_counter()
+        self._ensure_render()
+        if self._band_start < SCREEN_H:
+            self._render_band(self._band_start, SCREEN_H)
+        self.frame_bands = self.bands + 1
+        self.bands = 0
+        self._band_start = 0
+        self.line = 0
+        self.render_time = time.perf_counter() - t0
+        return self._surfaces[self._back] if self._surfaces is not None else None
+
+    def _render_band(self, y0: int, y1: int):
+        ci = self._ci[y0:y1]
+        if y0 == 0:
+            self.status &= ~STATUS_SPR_OVERFLOW & 0xFF
+
+        # Pass 1: background, copied out of the cached layer
+        self._refresh_bg()
+        self._scrolled(self._bg_ci, ci, y0, y1)
+        bg_prio = np.empty(ci.shape, dtype=np.bool_)
+        self._scrolled(self._bg_prio, bg_prio, y0, y1)
 
         # Pass 2: sprites (ID order; priority vs BG via bits)
-        for i in range(16):
-            base = i * 16
-            x0   = self.oam[base + 0]
-            y0   = self.oam[base + 1]
-            tile = self.oam[base + 2]
-            attr = self.oam[base + 3]
-            hflip = bool((attr >> 4) & 1)
-            vflip = bool((attr >> 5) & 1)
-            size  = 16 if ((attr >> 6) & 1) else 8
-            spr_prio = bool((attr >> 7) & 1)
-
-            for dy in range(size):
-                py = y0 + dy
-                if py < 0 or py >= SCREEN_H: continue
-                row_in_tile = dy % 8
-                if vflip: row_in_tile = 7 - row_in_tile
-                tile_row_offset = (dy // 8) * 2  # for 16x16: next row of tiles
-
-                # prefetch both (or one) tile-rows for this scan
-                # we’ll fetch per 8 columns to stay simple
-                for dx in range(size):
-                    px = x0 + dx
-                    if px < 0 or px >= SCREEN_W: continue
-                    col_in_tile = dx % 8
-                    if hflip: col_in_tile = 7 - col_in_tile
-                    tile_col_offset = (dx // 8)
-                    tid = (tile + tile_row_offset + tile_col_offset) & 0xFF
-                    row = self._fetch_tile_row(tid, row_in_tile, False, False)
-                    ci = row[col_in_tile]
-                    if ci == 0:  # transparent
-                        continue
-                    if not spr_prio and bg_prio[py, px]:
-                        continue
-                    self._fb[py, px] = self.palette[ci]
-
-        # Upload to pygame Surface (pygame surfarray expects (w,h,3); we transpose)
-        pygame.surfarray.blit_array(self.surface, self._fb.swapaxes(0, 1))
-        return self.surface
-
-    # --- tile decode: returns np.uint8[8] colour indices for a tile row ---
-    def _fetch_tile_row(self, tile_id: int, row: int, hflip: bool, vflip: bool) -> np.ndarray:
-        if vflip: row = 7 - row
-        base = (tile_id & 0xFF) * 32 + row * 4   # 4 bytes per row (8 px / 2 px per byte)
-        out = np.empty(8, dtype=np.uint8)
-        # slice from tileset bytearray
-        for i in range(4):
-            byte = self.tileset[base + i]
-            out[i*2]   = (byte >> 4) & 0xF
-            out[i*2+1] = byte & 0xF
-        if hflip:
-            out = out[::-1]
-        return out
+        cand = np.flatnonzero(self._spr_bands[y0 // BAND_LINES:(y1 - 1) // BAND_LINES + 1].any(axis=0))
+        if len(cand):
+            spr_y = self._oam_np[cand, 1].astype(np.intp)
+            spr_h = np.where(self._oam_np[cand, 3] & 0x40, 16, 8)
+            lines = np.arange(y0, y1)
+            # on[k, l]: candidate k covers band line l and is within the line limit
+            on = (lines[None, :] >= spr_y[:, None]) & (lines[None, :] < (spr_y + spr_h)[:, None])
+            if self.sprite_limit is not None:
+                per_line = np.cumsum(on, axis=0)
+                if per_line[-1].max() > self.sprite_limit:
+                    self.status |= STATUS_SPR_OVERFLOW
+                    on &= per_line <= self.sprite_limit
+                keep = on.any(axis=1)                   # past the limit on every line it covers
+                cand, spr_h, on = cand[keep], spr_h[keep], on[keep]
+            for k, i in enumerate(cand.tolist()):
+                x0, sy0, tile, attr = self._oam_np[i].tolist()
+                size = int(spr_h[k])
+                top, bot = max(sy0, y0), min(sy0 + size, y1)
+                if top >= bot:
+                    continue
+                spr = self._sprite_pixels(tile, attr, size)
+                spr = spr[top - sy0:bot - sy0, :SCREEN_W - x0]
+                rows = slice(top - y0, bot - y0)
+                cols = slice(x0, x0 + spr.shape[1])
+                mask = (spr != 0) & on[k, rows, None]            # 0 = transparent
+                if not (attr >> 7) & 1:
+                    mask &= ~bg_prio[rows, cols]
+                ci[rows, cols][mask] = spr[mask]
+
+        # palette lookup; no upload needed as the surface is backed by self._fb
+        self.colourize(ci, out=self._fb[y0:y1])
+
+    def colourize(self, ci: np.ndarray, out=None) -> np.ndarray:
+        """Colour indices -> RGB888 through the current palette (shape + (3,))."""
+        self._ensure_render()
+        return np.take(self._pal_lut, ci, axis=0, out=out)
+
+    def _scrolled(self, src: np.ndarray, dst: np.ndarray, y0: int, y1: int):
+        # dst[y - y0, x] = src[(y + scroll_y) % H, (x + scroll_x) % W] for y in
+        # [y0, y1), as at most two row runs of two column slices each
+        sx = self.scroll_x % SCREEN_W
+        y = y0
+        while y < y1:
+            r = (y + self.scroll_y) % SCREEN_H
+            n = min(y1 - y, SCREEN_H - r)
+            d, src_rows = dst[y - y0:y - y0 + n], src[r:r + n]
+            d[:, :SCREEN_W - sx] = src_rows[:, sx:]
+            d[:, SCREEN_W - sx:] = src_rows[:, :sx]
+            y += n
+
+    def _refresh_bg(self):
+        idx = np.frombuffer(self.tilemap_idx, dtype=np.uint8).reshape(MAP_H, MAP_W)
+        if self._dirty_tids:
+            self._bg_dirty |= np.isin(idx, list(self._dirty_tids))
+            self._dirty_tids.clear()
+        ty, tx = np.nonzero(self._bg_dirty)
+        if not len(ty):
+            return
+        attr = np.frombuffer(self.tilemap_att, dtype=np.uint8).reshape(MAP_H, MAP_W)[ty, tx]
+        t = self._decoded_tiles()[idx[ty, tx]]                  # (n, 8, 8)
+        t = np.where((attr & 0x20)[:, None, None] != 0, t[:, ::-1, :], t)   # vflip
+        t = np.where((attr & 0x10)[:, None, None] != 0, t[:, :, ::-1], t)   # hflip
+        self._bg_ci.reshape(MAP_H, TILE_H, MAP_W, TILE_W)[ty, :, tx, :] = t
+        self._bg_prio.reshape(MAP_H, TILE_H, MAP_W, TILE_W)[ty, :, tx, :] = ((attr & 0x40) != 0)[:, None, None]
+        self._bg_dirty[:] = False
+
+    def _index_sprite(self, i: int):
+        x, y = self.oam[i * OAM_ENTRY], self.oam[i * OAM_ENTRY + 1]
+        size = 16 if (self.oam[i * OAM_ENTRY + 3] >> 6) & 1 else 8
+        col = self._spr_bands[:, i]
+        col[:] = False
+        if x >= SCREEN_W:
+            return                  # hidden: in no band, so never a candidate
+        col[y // BAND_LINES:min(y + size - 1, SCREEN_H - 1) // BAND_LINES + 1] = True
+
+    def _sprite_pixels(self, tile: int, attr: int, size: int) -> np.ndarray:
+        # flips apply within each 8x8 tile; 16x16 sprites are tiles t,t+1 / t+2,t+3
+        tiles = self._decoded_tiles()
+        tids = ((tile + np.array([[0, 1], [2, 3]])) & 0xFF)[:size // 8, :size // 8]
+        t = tiles[tids]                                          # (r, c, 8, 8)
+        if (attr >> 5) & 1: t = t[:, :, ::-1, :]
+        if (attr >> 4) & 1: t = t[:, :, :, ::-1]
+        return t.swapaxes(1, 2).reshape(size, size)
+
+    # --- tile decode: (256, 8, 8) colour indices, rebuilt after tileset writes ---
+    def _decoded_tiles(self) -> np.ndarray:
+        if self._tiles_dirty:
+            raw = np.frombuffer(self.tileset, dtype=np.uint8).reshape(MAX_TILES, TILE_H, TILE_W // 2)
+            self._tiles[:, :, 0::2] = raw >> 4
+            self._tiles[:, :, 1::2] = raw & 0xF
+            self._tiles_dirty = False
+        return self._tiles
 
 from typing import Iterable, Sequence, Tuple, Dict, Optional
-import numpy as np
 
 # ---------- 4bpp tile packing ----------
 
@@ -249,8 +462,8 @@ def write_palette(ppu, entries: Iterable[Tuple[int,int,int]]):
     i = 0
     for (r,g,b) in entries:
         lo, hi = palette_entry_rgb444(r,g,b)
-        ppu.write8(0xA900 + i*2, lo)
-        ppu.write8(0xA900 + i*2 + 1, hi)
+        ppu.write8(PALETTE_BASE + i*2, lo)
+        ppu.write8(PALETTE_BASE + i*2 + 1, hi)
         i += 1
         if i >= 16: break
     # ensure derived palette is updated
@@ -347,14 +560,17 @@ def sprite_attr(*, palette_bank: int = 0, hflip=False, vflip=False, size16=False
     return a & 0xFF
 
 def place_sprite(ppu, index: int, x: int, y: int, tile_id: int, attr: int):
-    """Write one sprite into OAM at slot index (0..15)."""
-    assert 0 <= index < 16
-    base = 0xA800 + index * 16
+    """Write one sprite into OAM at slot index (0..ppu.num_sprites-1)."""
+    assert 0 <= index < ppu.num_sprites
+    base = OAM_BASE + index * OAM_ENTRY
     ppu.write8(base + 0, x & 0xFF)
     ppu.write8(base + 1, y & 0xFF)
     ppu.write8(base + 2, tile_id & 0xFF)
     ppu.write8(base + 3, attr & 0xFF)
-    # bytes 4..15 reserved/unused for now
+
+def hide_sprite(ppu, index: int):
+    """Park slot index off-screen (x = 0xFF), so it is neither drawn nor counted."""
+    ppu.write8(OAM_BASE + index * OAM_ENTRY, 0xFF)
 
 # ---------- Demo initialisation ----------
 def init_demo_palette(ppu):
@@ -409,6 +625,9 @@ def init_demo_sprites(ppu):
     place_sprite(ppu, 1, x=60,  y=40,  tile_id=7, attr=sprite_attr(hflip=True, vflip=True, size16=False, prio=False))
     # 16×16 sprite (2×2 tiles starting at tile 3)
     place_sprite(ppu, 2, x=100, y=80,  tile_id=3, attr=sprite_attr(size16=True, prio=True))
+    # the rest would otherwise sit at (0,0) and count against sprite_limit
+    for i in range(3, ppu.num_sprites):
+        hide_sprite(ppu, i)
 
 def init_demo_scene(ppu):
     init_demo_palette(ppu)        # overwrite with colourful palette
@@ -421,5 +640,5 @@ def init_demo_scene(ppu):
     ppu.write8(DISP_CTRL, bg | spr | on)
 
 def move_sprite_x(ppu, index: int, x: int):
-    base = 0xA800 + index * 16
+    base = OAM_BASE + index * OAM_ENTRY
     ppu.write8(base + 0, x & 0xFF)
\ No newline at end of file
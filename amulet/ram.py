@@ -1,10 +1,14 @@
-import torch
 from device import Device
 
 class Ram(Device):
     def __init__(self, start, size):
         self.start, self.size = start, size
-        self.mem = torch.zeros(size, dtype=torch.uint8)
+        self.mem = bytearray(size)
     def handles(self, addr): return self.start <= addr < self.start + self.size
-    def read8(self, addr):   return int(self.mem[addr - self.start].item())
+    def read8(self, addr):   return self.mem[addr - self.start]
     def write8(self, addr, v): self.mem[addr - self.start] = v & 0xFF
+    def dump(self) -> bytes:   return bytes(self.mem)
+    def load(self, blob):      self.mem[:] = blob
+    def read_block(self, addr, n):
+        o = addr - self.start
+        return bytes(self.mem[o:o + n])
@@ -1,10 +1,12 @@
-import torch
 from device import Device
 
 class Rom(Device):
     def __init__(self, start, data: bytes):
         self.start, self.size = start, len(data)
-        self.mem = torch.tensor(list(data), dtype=torch.uint8)
+        self.mem = bytes(data)
     def handles(self, addr): return self.start <= addr < self.start + self.size
-    def read8(self, addr):   return int(self.mem[addr - self.start].item())
-    def write8(self, addr, v): pass  # should this raise an error?
\ No newline at end of file
+    def read8(self, addr):   return self.mem[addr - self.start]
+    def write8(self, addr, v): pass  # should this raise an error?
+    def read_block(self, addr, n):
+        o = addr - self.start
+        return self.mem[o:o + n]
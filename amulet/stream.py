@@ -0,0 +1,282 @@
+"""Stream PPU frames to local clients and take controller input back.
+
+Wire format: every message is a u32 little-endian length followed by that
+many payload bytes; the first payload byte is the message type.
+
+server -> client
+  'F' u32 frame, f64 sent_at, u16 ntiles, 32B palette (RGB444 raw),
+      then ntiles x (u16 tile = ty*MAP_W + tx, 32B packed 4bpp tile)
+client -> server
+  'A' u32 frame, f64 sent_at       ack (sent_at echoed for latency)
+  'P' u8 pad, u8 bits              controller state -> ControllerHub.set_state
+
+Tiles are diffed against the last frame sent to that client: the stream
+is ordered and reliable, so that is exactly what the client holds once
+it applies the delta. Acks are only for flow control and latency. At most
+`max_inflight` frames are unacked per client; frames published while a
+client is at that limit are skipped, and it gets one larger catch-up
+delta to the latest frame once an ack frees a slot.
+
+`python stream.py` runs loopback_check() against a scripted PPU.
+"""
+import asyncio
+import struct
+import time
+
+import numpy as np
+
+from ppu import SCREEN_W, SCREEN_H, TILE_W, TILE_H, MAP_W, MAP_H
+
+_LEN = struct.Struct('<I')
+_FRAME_HDR = struct.Struct('<cIdH')
+_ACK = struct.Struct('<cId')
+_PAD = struct.Struct('<cBB')
+_TILE_ID = struct.Struct('<H')
+
+
+def _tiles(ci: np.ndarray) -> np.ndarray:
+    """(SCREEN_H, SCREEN_W) -> (MAP_H*MAP_W, 64) colour indices per tile."""
+    t = ci.reshape(MAP_H, TILE_H, MAP_W, TILE_W).swapaxes(1, 2)
+    return t.reshape(MAP_H * MAP_W, TILE_H * TILE_W)
+
+
+def encode_frame(frame_no: int, ci: np.ndarray, base, palette_raw: bytes, sent_at: float) -> bytes:
+    """Encode the tiles of ci that differ from base (None = send every tile)."""
+    cur = _tiles(ci)
+    if base is None:
+        changed = np.arange(MAP_H * MAP_W)
+    else:
+        changed = np.flatnonzero((cur != _tiles(base)).any(axis=1))
+    px = cur[changed]
+    packed = (px[:, 0::2] << 4) | px[:, 1::2]     # (n, 32), high nibble = left pixel
+    parts = [_FRAME_HDR.pack(b'F', frame_no, sent_at, len(changed)), bytes(palette_raw)]
+    for tid, blob in zip(changed.tolist(), packed):
+        parts.append(_TILE_ID.pack(tid))
+        parts.append(blob.tobytes())
+    payload = b''.join(parts)
+    return _LEN.pack(len(payload)) + payload
+
+
+def decode_frame(payload: bytes, ci: np.ndarray):
+    """Apply an 'F' payload to ci in place. Returns (frame_no, sent_at, palette_raw, ntiles)."""
+    _, frame_no, sent_at, n = _FRAME_HDR.unpack_from(payload)
+    off = _FRAME_HDR.size
+    palette_raw = payload[off:off + 32]
+    off += 32
+    view = ci.reshape(MAP_H, TILE_H, MAP_W, TILE_W)
+    for _ in range(n):
+        (tid,) = _TILE_ID.unpack_from(payload, off)
+        blob = np.frombuffer(payload, dtype=np.uint8, count=32, offset=off + 2)
+        off += 2 + 32
+        px = np.empty(64, dtype=np.uint8)
+        px[0::2] = blob >> 4
+        px[1::2] = blob & 0xF
+        ty, tx = divmod(tid, MAP_W)
+        view[ty, :, tx, :] = px.reshape(TILE_H, TILE_W)
+    return frame_no, sent_at, palette_raw, n
+
+
+async def _read_msg(reader):
+    (n,) = _LEN.unpack(await reader.readexactly(_LEN.size))
+    return await reader.readexactly(n)
+
+
+class _Client:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.base = None            # last colour-index frame sent
+        self.inflight = set()       # frame numbers sent and not yet acked
+        self.wake = asyncio.Event()
+        self.task = None            # connection handler
+        self.sent_frames = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.latencies = []         # send -> ack round trips (seconds)
+
+
+class FrameServer:
+    """asyncio server publishing PPU frames as tile deltas to local clients."""
+    def __init__(self, ppu, pads, host='127.0.0.1', port=0, max_inflight=2, max_buffer=256 * 1024):
+        self.ppu = ppu
+        self.pads = pads
+        self.host, self.port = host, port
+        self.max_inflight = max_inflight
+        self.max_buffer = max_buffer    # transport bytes queued before we drop
+        self.clients = []
+        self.frame_no = 0
+        self._frame = None
+        self._palette = bytes(32)
+        self._server = None
+        self._started = time.perf_counter()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started = time.perf_counter()
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        tasks = [c.task for c in self.clients]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def publish(self):
+        """Snapshot the PPU's last rendered frame and wake every client sender."""
+        self.frame_no += 1
+        self._frame = self.ppu.index_plane.copy()
+        self._palette = self.ppu.palette_raw
+        for c in self.clients:
+            c.wake.set()
+
+    async def _serve(self, reader, writer):
+        c = _Client(reader, writer)
+        c.task = asyncio.current_task()
+        self.clients.append(c)
+        sender = asyncio.ensure_future(self._send_loop(c))
+        try:
+            while True:
+                msg = await _read_msg(reader)
+                kind = msg[:1]
+                if kind == b'A':
+                    _, frame_no, sent_at = _ACK.unpack(msg)
+                    if frame_no in c.inflight:
+                        c.latencies.append(time.perf_counter() - sent_at)
+                        # acks arrive in order; anything older is acked too
+                        c.inflight = {k for k in c.inflight if k > frame_no}
+                        c.wake.set()
+                elif kind == b'P':
+                    _, pad, bits = _PAD.unpack(msg)
+                    self.pads.set_state(pad, bits)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass                            # client went away, or we are shutting down
+        finally:
+            sender.cancel()
+            self.clients.remove(c)
+            writer.close()
+
+    async def _send_loop(self, c):
+        last_sent = max(self.frame_no - 1, 0)
+        while True:
+            await c.wake.wait()
+            c.wake.clear()
+            if self._frame is None or self.frame_no == last_sent:
+                continue
+            busy = c.writer.transport.get_write_buffer_size() > self.max_buffer
+            if len(c.inflight) >= self.max_inflight or busy:
+                continue                    # the next ack or publish wakes us again
+            frame_no, frame = self.frame_no, self._frame
+            c.dropped += frame_no - last_sent - 1   # published but never sent to c
+            data = encode_frame(frame_no, frame, c.base, self._palette, time.perf_counter())
+            c.inflight.add(frame_no)
+            c.base = frame
+            c.writer.write(data)
+            c.bytes_sent += len(data)
+            c.sent_frames += 1
+            last_sent = frame_no
+            await c.writer.drain()
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        lines = []
+        for i, c in enumerate(self.clients):
+            lat = sorted(c.latencies[-256:])
+            p50 = lat[len(lat) // 2] * 1000 if lat else 0.0
+            p95 = lat[int(len(lat) * 0.95)] * 1000 if lat else 0.0
+            lines.append(f"client {i}: sent {c.sent_frames}  dropped {c.dropped}  "
+                         f"{c.bytes_sent / elapsed / 1024:.1f} KiB/s  "
+                         f"latency p50 {p50:.2f}ms p95 {p95:.2f}ms")
+        return "\n".join(lines) or "no clients"
+
+
+class FrameClient:
+    """Minimal loopback client: keeps a colour-index frame and acks each update."""
+    def __init__(self):
+        self.ci = np.zeros((SCREEN_H, SCREEN_W), dtype=np.uint8)
+        self.palette_raw = bytes(32)
+        self.frame_no = 0
+        self.frames = 0
+        self.tiles = 0
+        self.reader = self.writer = None
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        return self
+
+    async def recv_frame(self):
+        msg = await _read_msg(self.reader)
+        frame_no, sent_at, self.palette_raw, n = decode_frame(msg, self.ci)
+        self.frame_no = frame_no
+        self.frames += 1
+        self.tiles += n
+        self._send(_ACK.pack(b'A', frame_no, sent_at))
+        await self.writer.drain()
+        return frame_no
+
+    async def set_pad(self, pad, bits):
+        self._send(_PAD.pack(b'P', pad, bits & 0xFF))
+        await self.writer.drain()
+
+    def _send(self, payload):
+        self.writer.write(_LEN.pack(len(payload)) + payload)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve_headless(ppu, pads, emulate_frame, fps=30, port=0, report_every=60):
+    """Run the machine headless, publishing each frame to any connected clients."""
+    server = await FrameServer(ppu, pads, port=port).start()
+    print(f"streaming on {server.host}:{server.port}")
+    period = 1.0 / fps
+    frames = 0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            alive = emulate_frame()
+            server.publish()
+            frames += 1
+            if report_every and frames % report_every == 0:
+                print(server.stats())
+            if not alive:
+                break
+            await asyncio.sleep(max(0.0, period - (time.perf_counter() - t0)))
+    finally:
+        await server.close()
+
+
+async def loopback_check(max_inflight=2):
+    """Serve scripted frames to a loopback client that acks late, so several
+    deltas are in flight at once, and check it ends up showing what the
+    server last published. Returns the number of frames the client got."""
+    from types import SimpleNamespace
+    ppu = SimpleNamespace(index_plane=np.zeros((SCREEN_H, SCREEN_W), dtype=np.uint8),
+                          palette_raw=bytes(32))
+    server = await FrameServer(ppu, pads=None, max_inflight=max_inflight).start()
+    client = await FrameClient().connect(server.host, server.port)
+    try:
+        while not server.clients:
+            await asyncio.sleep(0)
+        # a tile flips 0 -> 5 -> 0 -> 5 ... while the client sits on its acks
+        for n in range(1, 8):
+            ppu.index_plane[:TILE_H, :TILE_W] = 5 if n % 2 else 0
+            ppu.index_plane[-1, -1] = n
+            server.publish()
+            await asyncio.sleep(0.01)
+        assert len(server.clients[0].inflight) == max_inflight, "acks arrived too early"
+        while client.frame_no != server.frame_no:
+            await asyncio.wait_for(client.recv_frame(), timeout=2.0)
+        assert client.frames > 1
+        assert (client.ci == ppu.index_plane).all(), "client shows a different frame"
+        return client.frames
+    finally:
+        await client.close()
+        await server.close()
+
+
+if __name__ == "__main__":
+    print(f"loopback ok: {asyncio.run(loopback_check())} frames received")